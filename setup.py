@@ -1,4 +1,30 @@
-from setuptools import setup
+import os
+
+from setuptools import Extension, setup
+
+FAST_PYX = 'zubr/_fast.pyx'
+FAST_C = 'zubr/_fast.c'
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+# Build failure is not fatal, pure Python fallback is used then
+if cythonize is not None and os.path.exists(FAST_PYX):
+    ext_modules = cythonize(
+        [
+            Extension('zubr._fast', [FAST_PYX], optional=True),
+        ],
+        language_level=3,
+    )
+elif os.path.exists(FAST_C):
+    # Generated C source shipped in sdist
+    ext_modules = [
+        Extension('zubr._fast', [FAST_C], optional=True),
+    ]
+else:
+    ext_modules = []
 
 setup(
     name='zubr',
@@ -13,6 +39,7 @@ setup(
     packages=[
         'zubr',
     ],
+    ext_modules=ext_modules,
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
@@ -22,4 +49,13 @@ setup(
     install_requires=[
         'websocket-client==0.57.0'
     ],
+    extras_require={
+        'fast': [
+            'orjson',
+        ],
+        'aio': [
+            'websockets>=8.0,<14.0',
+            'uvloop; platform_system != "Windows"',
+        ],
+    },
 )
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import unittest
+from decimal import Decimal
+
+try:
+    import websockets
+    from zubr.aio import AsyncZubrSDK
+except ImportError:
+    websockets = None
+
+API_KEY = 'key'
+API_SECRET = '00ff'
+
+
+@unittest.skipIf(websockets is None, 'websockets is not installed')
+class AsyncZubrSDKTestCase(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def test_login_subscribe_and_dispatch(self):
+        requests = []
+        orderbook = []
+
+        async def handler(ws, path=None):
+            async for message in ws:
+                request = json.loads(message)
+                requests.append(request)
+
+                if request['method'] == 9:
+                    await ws.send(json.dumps({
+                        'id': request['id'],
+                        'result': {'tag': 'ok', 'value': None},
+                    }))
+                else:
+                    await ws.send(json.dumps({
+                        'result': {
+                            'channel': request['params']['channel'],
+                            'data': {
+                                'tag': 'ok',
+                                'value': {
+                                    'asks': [
+                                        {
+                                            'price': {
+                                                'mantissa': 10038,
+                                                'exponent': -1,
+                                            },
+                                            'size': 1,
+                                        },
+                                    ],
+                                },
+                            },
+                        },
+                    }))
+                    await ws.close()
+
+        async def main():
+            server = await websockets.serve(handler, 'localhost', 0)
+            port = server.sockets[0].getsockname()[1]
+
+            try:
+                sdk = AsyncZubrSDK(
+                    api_key=API_KEY,
+                    api_secret=API_SECRET,
+                    api_url=f'ws://localhost:{port}',
+                )
+                sdk.subscribe_orderbook(orderbook.append)
+
+                await asyncio.wait_for(sdk.run(), 5)
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        self.loop.run_until_complete(main())
+
+        # Subscription is delayed until login response
+        self.assertEqual(
+            [request['method'] for request in requests],
+            [9, 1]
+        )
+        self.assertEqual(
+            requests[0]['params']['data']['method'],
+            'loginSessionByApiToken'
+        )
+        self.assertEqual(requests[1]['params'], {'channel': 'orderbook'})
+
+        self.assertEqual(orderbook, [{
+            'tag': 'ok',
+            'value': {
+                'asks': [{'price': Decimal('1003.8'), 'size': 1}],
+            },
+        }])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from decimal import Decimal
+
+import zubr
+
+try:
+    from zubr import _fast
+except ImportError:
+    _fast = None
+
+
+def _response():
+    return {
+        'id': 1,
+        'result': {
+            'price': {'mantissa': 10038, 'exponent': -1},
+            'size': {'mantissa': 5, 'exponent': 0},
+            'asks': [
+                {'price': {'mantissa': -5, 'exponent': -3}},
+                [{'mantissa': 1, 'exponent': 2}, 'text', None],
+            ],
+            'nested': [[[{'mantissa': 15, 'exponent': -1}]]],
+            'symbol': 'BTCUSD',
+        },
+    }
+
+
+def _copy(value):
+    if type(value) is dict:
+        return {k: _copy(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_copy(v) for v in value]
+    return value
+
+
+def _types(value):
+    # Decimal('1') == 1, so types are compared too
+    if type(value) is dict:
+        return {k: _types(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_types(v) for v in value]
+    return type(value)
+
+
+@unittest.skipIf(_fast is None, 'zubr._fast extension is not built')
+class FastTestCase(unittest.TestCase):
+    """
+    Compiled functions must match pure Python implementations
+    """
+
+    def test_encode_decimal(self):
+        values = [
+            0, -12, 10038,
+            '1003.8', '-0.5', '-.5', '.5', '5.', '+1.50', '0.000', '100',
+            '1e2', '1.5E-2',
+            Decimal('1.50'), Decimal('-0.005'), Decimal('1E+2'),
+        ]
+
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    _fast.encode_decimal(value),
+                    zubr._py_encode_decimal(value)
+                )
+
+    def test_encode_decimal_invalid(self):
+        for value in ['-', '1.-5', 'abc']:
+            with self.subTest(value=value):
+                with self.assertRaises(ArithmeticError):
+                    zubr._py_encode_decimal(value)
+
+                with self.assertRaises(ArithmeticError):
+                    _fast.encode_decimal(value)
+
+    def test_decode_decimal(self):
+        for value in [{'mantissa': 15, 'exponent': -1},
+                      {'mantissa': 7, 'exponent': 0},
+                      {'mantissa': -1, 'exponent': 2}]:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    str(_fast.decode_decimal(value)),
+                    str(zubr._py_decode_decimal(value))
+                )
+
+    def test_decode_response(self):
+        responses = [
+            _response(),
+            [_response(), [{'mantissa': 3, 'exponent': -2}]],
+            {'mantissa': 15, 'exponent': -1},
+            {'mantissa': 7, 'exponent': 0},
+            [],
+            'text',
+            5,
+            None,
+        ]
+
+        for response in responses:
+            with self.subTest(response=response):
+                expected = zubr._py_decode_response(_copy(response))
+                result = _fast.decode_response(_copy(response))
+
+                self.assertEqual(result, expected)
+                self.assertEqual(_types(result), _types(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
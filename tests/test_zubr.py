@@ -0,0 +1,224 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest import mock
+
+import zubr
+from zubr import OrderSide, OrderType, TimeInForce, ZubrSDK
+
+
+def _callback(*args):
+    pass
+
+
+class DecimalTestCase(unittest.TestCase):
+    """
+    Pure Python implementations, used when zubr._fast is not built
+    """
+
+    def test_encode_decimal(self):
+        values = [
+            (0, {'mantissa': 0, 'exponent': 0}),
+            (-12, {'mantissa': -12, 'exponent': 0}),
+            ('1003.8', {'mantissa': 10038, 'exponent': -1}),
+            ('-0.5', {'mantissa': -5, 'exponent': -1}),
+            ('-.5', {'mantissa': -5, 'exponent': -1}),
+            ('.5', {'mantissa': 5, 'exponent': -1}),
+            ('5.', {'mantissa': 5, 'exponent': 0}),
+            ('+1.50', {'mantissa': 150, 'exponent': -2}),
+            ('0.000', {'mantissa': 0, 'exponent': -3}),
+            ('100', {'mantissa': 100, 'exponent': 0}),
+            ('1e2', {'mantissa': 1, 'exponent': 2}),
+            ('1.5E-2', {'mantissa': 15, 'exponent': -3}),
+            (Decimal('1.50'), {'mantissa': 150, 'exponent': -2}),
+            (Decimal('-0.005'), {'mantissa': -5, 'exponent': -3}),
+        ]
+
+        for value, expected in values:
+            with self.subTest(value=value):
+                result = zubr._py_encode_decimal(value)
+                self.assertEqual(result, expected)
+
+                # String fast path must agree with Decimal parsing
+                decimal_value = Decimal(value)
+                self.assertEqual(
+                    result['exponent'],
+                    decimal_value.as_tuple().exponent
+                )
+                self.assertEqual(
+                    Decimal(result['mantissa']).scaleb(result['exponent']),
+                    decimal_value
+                )
+
+    def test_encode_decimal_invalid(self):
+        for value in ['-', '.', '1.-5', 'abc', '']:
+            with self.subTest(value=value):
+                with self.assertRaises(ArithmeticError):
+                    zubr._py_encode_decimal(value)
+
+    def test_decode_decimal(self):
+        values = [
+            ({'mantissa': 15, 'exponent': -1}, '1.5'),
+            ({'mantissa': 7, 'exponent': 0}, '7'),
+            ({'mantissa': -5, 'exponent': -3}, '-0.005'),
+            ({'mantissa': 1, 'exponent': 2}, '1E+2'),
+        ]
+
+        for value, expected in values:
+            with self.subTest(value=value):
+                self.assertEqual(
+                    str(zubr._py_decode_decimal(value)),
+                    expected
+                )
+
+    def test_decode_response(self):
+        response = {
+            'id': 1,
+            'result': {
+                'price': {'mantissa': 10038, 'exponent': -1},
+                'asks': [
+                    {'price': {'mantissa': -5, 'exponent': -3}},
+                    [{'mantissa': 1, 'exponent': 2}, 'text', None],
+                ],
+                'nested': [[[{'mantissa': 15, 'exponent': -1}]]],
+                'symbol': 'BTCUSD',
+            },
+        }
+
+        self.assertEqual(
+            zubr._py_decode_response(response),
+            {
+                'id': 1,
+                'result': {
+                    'price': Decimal('1003.8'),
+                    'asks': [
+                        {'price': Decimal('-0.005')},
+                        [Decimal('1E+2'), 'text', None],
+                    ],
+                    'nested': [[[Decimal('1.5')]]],
+                    'symbol': 'BTCUSD',
+                },
+            }
+        )
+
+    def test_decode_response_list(self):
+        result = zubr._py_decode_response(
+            [{'mantissa': 15, 'exponent': -1}, {'mantissa': 7, 'exponent': 0}]
+        )
+
+        self.assertEqual(result, [Decimal('1.5'), Decimal('7')])
+        self.assertIs(type(result[0]), Decimal)
+        self.assertIs(type(result[1]), Decimal)
+
+    def test_decode_response_scalar(self):
+        self.assertEqual(
+            zubr._py_decode_response({'mantissa': 15, 'exponent': -1}),
+            Decimal('1.5')
+        )
+
+        for value in ['text', 5, None, []]:
+            with self.subTest(value=value):
+                self.assertEqual(zubr._py_decode_response(value), value)
+
+
+class RequestTestCase(unittest.TestCase):
+    """
+    Requests sent before connection is opened are kept as delayed
+    """
+
+    def setUp(self):
+        self.sdk = ZubrSDK(api_key='key', api_secret='00ff')
+
+    def test_subscribe(self):
+        self.sdk.subscribe_orderbook(_callback)
+        self.sdk.subscribe_candles(1, '1"h', _callback)
+
+        self.assertEqual(
+            self.sdk._delayed_requests,
+            [
+                b'{"id":1,"method":1,"params":{"channel":"orderbook"}}',
+                b'{"id":2,"method":1,'
+                b'"params":{"channel":"candles:1:1\\"h"}}',
+            ]
+        )
+
+    def test_subscribe_twice(self):
+        self.sdk.subscribe_orderbook(_callback)
+
+        with self.assertRaises(Exception):
+            self.sdk.subscribe_orderbook(_callback)
+
+    def test_resubscribe(self):
+        self.sdk.subscribe_orderbook(_callback)
+        self.sdk._delayed_requests.clear()
+        self.sdk._resubscribe()
+
+        self.assertEqual(
+            self.sdk._delayed_requests,
+            [b'{"id":2,"method":1,"params":{"channel":"orderbook"}}']
+        )
+
+    def test_rpc(self):
+        self.sdk.cancel_order('12345', _callback)
+        self.sdk.get_candles_range(1, '1h', 100, 200, _callback)
+        self.sdk.place_order(
+            instrument_id=1,
+            price='1003.8',
+            size=2,
+            order_type=OrderType.LIMIT,
+            time_in_force=TimeInForce.GTC,
+            side=OrderSide.BUY,
+            callback=_callback
+        )
+
+        self.assertEqual(
+            self.sdk._delayed_requests,
+            [
+                b'{"id":1,"method":9,"params":{"data":'
+                b'{"method":"cancelOrder","params":"12345"}}}',
+                b'{"id":2,"method":9,"params":{"data":'
+                b'{"method":"getCandlesRange","params":{"instrumentId":1,'
+                b'"resolution":"1h","from":100,"to":200}}}}',
+                b'{"id":3,"method":9,"params":{"data":'
+                b'{"method":"placeOrder","params":{"instrument":1,'
+                b'"price":{"mantissa":10038,"exponent":-1},"size":2,'
+                b'"type":"LIMIT","timeInForce":"GTC","side":"BUY"}}}}',
+            ]
+        )
+
+
+class LoginTestCase(unittest.TestCase):
+    def test_login_request(self):
+        sdk = ZubrSDK(api_key='key', api_secret='00ff10ab')
+        utc_now = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+        with mock.patch('zubr.datetime') as datetime_mock:
+            datetime_mock.now.return_value = utc_now
+            sdk._try_login()
+
+        self.assertEqual(
+            sdk._hmac_message_prefix + b'1577934245',
+            b'key=key;time=1577934245'
+        )
+
+        request = json.loads(sdk._delayed_requests[0])
+        self.assertEqual(
+            request['params']['data'],
+            {
+                'method': 'loginSessionByApiToken',
+                'params': {
+                    'apiKey': 'key',
+                    'time': {'seconds': 1577934245, 'nanos': 0},
+                    # HMAC-SHA256 of b'key=key;time=1577934245'
+                    'hmacDigest': (
+                        '41cdc1a206606ea6a4b5700fe2f6849a'
+                        '3ae11983868397f6e28795bc4d41b867'
+                    ),
+                },
+            }
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,42 @@
-import hashlib
-import json
+import hmac
 import logging
+import socket
+from collections import deque
+from contextlib import contextmanager
 from datetime import timezone, datetime
 from decimal import Decimal
 from enum import IntEnum, Enum
-from hmac import HMAC
-from typing import Callable, Union, Dict, Optional
+from threading import Event, Lock, Thread
+from queue import Queue
+from typing import Callable, Union, Dict, List, Optional, Tuple
 
-from websocket import WebSocketApp
+from websocket import ABNF, WebSocketApp
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    import json
+
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        # orjson produces bytes, keep the same type for all backends
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+try:
+    # Single call into OpenSSL, available since Python 3.7
+    _hmac_digest = hmac.digest
+except AttributeError:
+    def _hmac_digest(key: bytes, msg: bytes, digest: str) -> bytes:
+        return hmac.new(key, msg, digest).digest()
+
+try:
+    from queue import SimpleQueue
+except ImportError:  # Python < 3.7
+    SimpleQueue = Queue
 
 __all__ = {
     "ZubrSDK",
@@ -20,6 +49,17 @@ __all__ = {
 
 logger = logging.getLogger(__name__)
 
+# Max number of frames written to the socket at once
+_SEND_BATCH_SIZE = 64
+
+# Holds partial TCP segments until uncorked: Linux and BSD/macOS variants
+_TCP_CORK = getattr(socket, 'TCP_CORK', getattr(socket, 'TCP_NOPUSH', None))
+
+# Callbacks of pending requests are stored in a ring indexed by request id,
+# each slot keeps the id it belongs to
+_CALLBACKS_RING_SIZE = 65536
+_CALLBACKS_RING_MASK = _CALLBACKS_RING_SIZE - 1
+
 
 class ZubrSDKError(Exception):
     """
@@ -45,21 +85,60 @@ class _Method(IntEnum):
     RPC = 9
 
 
+# Request templates, values are inserted already JSON encoded except RPC
+# method names, which are SDK constants and need no escaping
+_REQUEST_ID_FORMAT = b'{"id":%d'
+# Everything after the id, cached per channel to resubscribe
+_CHANNEL_REQUEST_TAIL_FORMAT = (
+    b',"method":%d,"params":{"channel":%%s}}' % _Method.CHANNEL
+)
+_RPC_REQUEST_FORMAT = (
+    b'{"id":%%d,"method":%d,"params":{"data":{"method":"%%s","params":%%s}}}'
+    % _Method.RPC
+)
+
+
 def _decode_decimal(encoded_decimal: dict):
     """
     Decodes decimal from internal format
     """
-    return Decimal(
-        encoded_decimal['mantissa']
-    ).scaleb(
-        encoded_decimal['exponent']
-    )
+    mantissa = encoded_decimal['mantissa']
+    exponent = encoded_decimal['exponent']
+
+    # Integer values need no scaling
+    if not exponent:
+        return Decimal(mantissa)
+
+    return Decimal(mantissa).scaleb(exponent)
 
 
 def _encode_decimal(value: Union[Decimal, int, str]):
     """
     Encodes decimal into internal format
     """
+    value_type = type(value)
+
+    if value_type is int:
+        return {
+            'mantissa': value,
+            'exponent': 0
+        }
+
+    if value_type is str:
+        integer, _, fraction = value.partition('.')
+        digits = integer[1:] if integer[:1] in ('-', '+') else integer
+
+        # Plain decimal notation is parsed without constructing Decimal
+        if (digits or fraction) and (
+            not digits or digits.isdecimal()
+        ) and (
+            not fraction or fraction.isdecimal()
+        ):
+            return {
+                'mantissa': int(integer + fraction),
+                'exponent': -len(fraction)
+            }
+
     value = Decimal(value)
     exponent = value.as_tuple().exponent
     mantissa = int(value.scaleb(-exponent))
@@ -73,31 +152,60 @@ def _encode_decimal(value: Union[Decimal, int, str]):
 def _decode_response(response: Union[dict, list]) -> Union[dict, list]:
     """
     Decodes internal decimal representation into decimal.Decimal()
+
+    Containers are walked iteratively and modified in place
     """
-    if isinstance(response, dict):
-        if 'mantissa' in response and 'exponent' in response:
-            return _decode_decimal(response)
+    if type(response) is dict and (
+        'mantissa' in response and 'exponent' in response
+    ):
+        return _decode_decimal(response)
+
+    if type(response) is not dict and type(response) is not list:
+        return response
+
+    decode_decimal = _decode_decimal
+    stack = deque((response,))
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        container = pop()
+
+        if type(container) is dict:
+            items = container.items()
         else:
-            for key, value in response.items():
-                response[key] = _decode_response(value)
+            items = enumerate(container)
+
+        for key, value in items:
+            value_type = type(value)
 
-            return response
-    elif isinstance(response, list):
-        for item in response:
-            _decode_response(item)
+            if value_type is dict:
+                if 'mantissa' in value and 'exponent' in value:
+                    # Replacing the value of an existing key is safe
+                    # while iterating
+                    container[key] = decode_decimal(value)
+                else:
+                    push(value)
+            elif value_type is list:
+                push(value)
 
     return response
 
 
-def login_required(fn) -> Callable:
-    def wrap(self, *args, **kwargs):
-        if not (self._api_key and self._api_secret):
-            raise ZubrSDKError(
-                'Login required to perform this operation'
-            )
-        return fn(self, *args, **kwargs)
+# Pure Python versions, the extension is tested against them
+_py_decode_decimal = _decode_decimal
+_py_decode_response = _decode_response
+_py_encode_decimal = _encode_decimal
 
-    return wrap
+try:
+    # Compiled versions of the functions above, built when Cython is available
+    from ._fast import (
+        decode_decimal as _decode_decimal,
+        decode_response as _decode_response,
+        encode_decimal as _encode_decimal,
+    )
+except ImportError:
+    pass
 
 
 CallbackType = Callable[[Dict], None]
@@ -130,17 +238,52 @@ class ZubrSDK:
     ):
         self._api_key: str = api_key
         self._api_secret: str = api_secret
+        self._api_secret_bytes: Optional[bytes] = (
+            bytes.fromhex(api_secret) if api_secret else None
+        )
+        # Signed message is 'key={api_key};time={timestamp}'
+        self._hmac_message_prefix: Optional[bytes] = (
+            b'key=' + api_key.encode('utf-8') + b';time='
+            if api_key else None
+        )
         self._api_url: str = api_url.rstrip('/')
 
         self._logged_in: bool = False
         self._message_id: int = 0
 
         self._channel_callbacks: Dict[str, CallbackType] = {}
-        self._message_callbacks: Dict[str, CallbackType] = {}
+        self._subscription_frames: Dict[str, bytes] = {}
+        self._message_callbacks: List[Optional[Tuple[int, CallbackType]]] = (
+            [None] * _CALLBACKS_RING_SIZE
+        )
         self._error_callback: Optional[CallbackType] = None
         self._default_callback: Optional[CallbackType] = default_callback
         self._delayed_requests = []
+        self._ws_open: bool = False
+
+        self._init_transport(api_url)
 
+        # Credentials never change, so the check is done once here
+        if not (api_key and api_secret):
+            self.place_order = self._login_required
+            self.replace_order = self._login_required
+            self.buy = self._login_required
+            self.sell = self._login_required
+            self.cancel_order = self._login_required
+
+    def _init_transport(self, api_url: str):
+        """
+        Creates websocket app and the state of sender and worker threads
+        """
+        # Outgoing frames are written in batches by the sender thread
+        self._send_queue = deque()
+        self._send_lock = Lock()
+        self._send_event = Event()
+        self._sender: Optional[Thread] = None
+
+        # Incoming messages are decoded and dispatched by the worker thread
+        self._in_queue = SimpleQueue()
+        self._worker: Optional[Thread] = None
 
         self._ws_app: WebSocketApp = WebSocketApp(
             api_url,
@@ -149,19 +292,28 @@ class ZubrSDK:
             ],
             on_open=self._on_open,
             on_message=self._on_message,
+            on_close=self._on_close,
         )
-        self._ws_open: bool = False
 
-    def _resubscribe(self):
-        channel_callbacks = self._channel_callbacks
-        self._channel_callbacks = {}
+    @staticmethod
+    def _login_required(*args, **kwargs):
+        raise ZubrSDKError(
+            'Login required to perform this operation'
+        )
 
-        for channel, callback in channel_callbacks.items():
-            self._subscribe(channel, callback)
+    def _resubscribe(self):
+        """
+        Sends cached subscription requests with new ids
+        """
+        for request_tail in self._subscription_frames.values():
+            self._send(
+                _REQUEST_ID_FORMAT % self._next_message_id() + request_tail
+            )
 
     def subscribe_errors(self, callback: CallbackType):
         """
         Callback will be called when server sends response errors
+        and when queued requests could not be sent
         """
         self._error_callback = callback
 
@@ -186,7 +338,6 @@ class ZubrSDK:
     def subscribe_candles(self, instrument_id: int, resolution: str, callback: CallbackType):
         self._subscribe(f'candles:{instrument_id}:{resolution}', callback)
 
-    @login_required
     def place_order(
         self,
         instrument_id: int,
@@ -220,7 +371,6 @@ class ZubrSDK:
             callback=callback
         )
 
-    @login_required
     def replace_order(
         self,
         order_id: str,
@@ -238,7 +388,6 @@ class ZubrSDK:
             callback=callback
         )
 
-    @login_required
     def buy(
         self,
         instrument_id: int,
@@ -262,7 +411,6 @@ class ZubrSDK:
             side=OrderSide.BUY,
         )
 
-    @login_required
     def sell(
         self,
         instrument_id: int,
@@ -286,7 +434,6 @@ class ZubrSDK:
             side=OrderSide.SELL,
         )
 
-    @login_required
     def cancel_order(
         self,
         order_id: str,
@@ -317,19 +464,34 @@ class ZubrSDK:
         )
 
     def run_forever(self):
-        self._ws_app.run_forever(
-            ping_interval=15,
-            suppress_origin=True
-        )
+        self._worker = Thread(target=self._consume_loop, daemon=True)
+        self._worker.start()
+
+        try:
+            self._ws_app.run_forever(
+                ping_interval=15,
+                suppress_origin=True,
+                # Messages are validated by JSON decoder anyway
+                skip_utf8_validation=True,
+            )
+        finally:
+            # Let the worker dispatch received messages and stop
+            self._in_queue.put(None)
+            self._worker.join()
 
-    @staticmethod
-    def _encode_hmac_message(message):
-        buffer = []
+    def flush(self):
+        """
+        Sends all queued requests immediately
 
-        for key in sorted(message.keys()):
-            buffer.append(f'{key}={message[key]}')
+        Raises socket errors, requests which were not sent are kept
+        and sent again after reconnect
+        """
+        if not self._ws_open:
+            return
 
-        return ';'.join(buffer).encode('utf-8')
+        with self._send_lock:
+            while self._send_queue:
+                self._write_batch()
 
     def _on_login(self, response: dict):
         if 'error' in response:
@@ -360,14 +522,11 @@ class ZubrSDK:
         utc_now = datetime.now(timezone.utc)
         timestamp = int(utc_now.timestamp())
 
-        auth_code = HMAC(
-            key=bytes.fromhex(self._api_secret),
-            msg=self._encode_hmac_message({
-                'key': self._api_key,
-                'time': timestamp,
-            }),
-            digestmod=hashlib.sha256
-        ).digest().hex()
+        auth_code = _hmac_digest(
+            self._api_secret_bytes,
+            self._hmac_message_prefix + str(timestamp).encode('utf-8'),
+            'sha256'
+        ).hex()
 
         self._rpc(
             'loginSessionByApiToken',
@@ -386,24 +545,87 @@ class ZubrSDK:
         delayed_requests = self._delayed_requests
         self._delayed_requests = []
 
-        for request in delayed_requests:
-            self._ws_app.send(request)
+        self._send_queue.extend(delayed_requests)
 
-    def _create_request(
-        self,
-        method: _Method,
-        params: dict,
-    ) -> dict:
+        with self._corked():
+            self.flush()
+
+    @contextmanager
+    def _corked(self):
         """
-        Creates request message
+        Coalesces socket writes into full TCP segments where supported
         """
-        self._message_id += 1
+        ws = self._ws_app.sock
+        sock = ws and ws.sock
 
-        return {
-            'id': self._message_id,
-            'method': method,
-            'params': params
-        }
+        if sock is None or _TCP_CORK is None:
+            yield
+            return
+
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, _TCP_CORK, 1)
+        except OSError:
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, _TCP_CORK, 0)
+            except OSError:
+                pass
+
+    def _write_batch(self):
+        """
+        Writes up to _SEND_BATCH_SIZE queued frames with a single socket call
+        """
+        send_queue = self._send_queue
+        batch = []
+
+        while send_queue and len(batch) < _SEND_BATCH_SIZE:
+            batch.append(send_queue.popleft())
+
+        buffer = b''.join(
+            ABNF.create_frame(request, ABNF.OPCODE_TEXT).format()
+            for request in batch
+        )
+
+        try:
+            ws = self._ws_app.sock
+
+            with ws.lock:
+                ws.sock.sendall(buffer)
+        except Exception:
+            # Put the batch back in front of newer requests
+            send_queue.extendleft(reversed(batch))
+            raise
+
+    def _send_loop(self):
+        while self._ws_open:
+            self._send_event.wait()
+            self._send_event.clear()
+
+            try:
+                self.flush()
+            except Exception as e:
+                self._on_send_error(e)
+
+    def _on_send_error(self, error: Exception):
+        if self._error_callback is None:
+            logger.error('Failed to send requests: %s', error)
+            return
+
+        self._error_callback({
+            'error': {
+                'message': f'Failed to send requests: {error}',
+                'code': None,
+            }
+        })
+
+    def _next_message_id(self) -> int:
+        self._message_id += 1
+        return self._message_id
 
     def _subscribe(self, channel: str, callback: CallbackType):
         """
@@ -415,19 +637,23 @@ class ZubrSDK:
             )
 
         self._channel_callbacks[channel] = callback
-        request = self._create_request(
-            _Method.CHANNEL,
-            {'channel': channel}
-        )
-        self._send(request)
+        # Channel may contain user input, e.g. candles resolution
+        request_tail = _CHANNEL_REQUEST_TAIL_FORMAT % _json_dumps(channel)
+        self._subscription_frames[channel] = request_tail
 
-    def _send(self, request: dict):
-        request = json.dumps(request)
+        self._send(
+            _REQUEST_ID_FORMAT % self._next_message_id() + request_tail
+        )
 
+    def _send(self, frame: bytes):
+        """
+        Sends serialized request, text frame payload is sent as utf-8 bytes
+        """
         if self._ws_open:
-            self._ws_app.send(request)
+            self._send_queue.append(frame)
+            self._send_event.set()
         else:
-            self._delayed_requests.append(request)
+            self._delayed_requests.append(frame)
 
     def _rpc(
         self,
@@ -438,38 +664,92 @@ class ZubrSDK:
         """
         Sends rpc request to the server
         """
-        request = self._create_request(
-            _Method.RPC,
-            {
-                "data": {
-                    "method": method,
-                    "params": params or {}
-                }
-            }
-        )
+        message_id = self._next_message_id()
 
         if callback:
-            self._message_callbacks[request['id']] = callback
+            self._message_callbacks[message_id & _CALLBACKS_RING_MASK] = (
+                message_id,
+                callback
+            )
 
-        self._send(request)
+        self._send(
+            _RPC_REQUEST_FORMAT % (
+                message_id,
+                method.encode('utf-8'),
+                _json_dumps(params or {})
+            )
+        )
 
     def _on_open(self):
         self._ws_open = True
+
+        self._sender = Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+
         self._try_login()
 
+    def _on_close(self, *args):
+        with self._send_lock:
+            self._ws_open = False
+
+            # Unsent requests are sent after the next login
+            self._delayed_requests[:0] = self._send_queue
+            self._send_queue.clear()
+
+        self._send_event.set()
+
     def _on_message(
         self,
         message: str,
     ):
-        data = json.loads(message)
-        data = _decode_response(data)
+        self._in_queue.put(message)
+
+    def _consume_loop(self):
+        while True:
+            message = self._in_queue.get()
+
+            if message is None:
+                return
+
+            try:
+                self._process_message(message)
+            except Exception:
+                logger.exception('Failed to handle message')
+
+    def _process_message(
+        self,
+        message: str,
+    ):
+        data = _json_loads(message)
+
+        # Substring search is much cheaper than walking the whole message,
+        # decoding is done only for messages which are dispatched
+        has_decimals = '"mantissa"' in message
 
         if 'id' in data:
-            callback = self._message_callbacks.pop(data['id'], None)
+            message_id = data['id']
+
+            # Request ids are always integers, null is sent for
+            # requests the server failed to parse
+            if type(message_id) is not int:
+                return
+
+            slot = message_id & _CALLBACKS_RING_MASK
+            pending = self._message_callbacks[slot]
+
+            # Slot may be reused by a newer request or hold a stale one
+            if pending is not None and pending[0] == message_id:
+                callback = pending[1]
+                self._message_callbacks[slot] = None
+
+                if has_decimals:
+                    data = _decode_response(data)
 
-            if callback:
                 callback(data)
         elif 'error' in data:
+            if has_decimals:
+                data = _decode_response(data)
+
             error_message = data['error'].get('message')
             error_code = data['error'].get('code')
 
@@ -483,14 +763,19 @@ class ZubrSDK:
                 self._error_callback(data)
         elif 'channel' in data['result']:
             result: dict = data['result']
-            channel_key = result['channel']
+            channel_handler = self._channel_callbacks.get(result['channel'])
+
+            if channel_handler is None:
+                return
+
             data = result['data']
 
-            try:
-                channel_handler = self._channel_callbacks[channel_key]
-            except KeyError:
-                pass
-            else:
-                channel_handler(data)
+            if has_decimals:
+                data = _decode_response(data)
+
+            channel_handler(data)
         elif self._default_callback:
+            if has_decimals:
+                data = _decode_response(data)
+
             self._default_callback(data)
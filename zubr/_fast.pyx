@@ -0,0 +1,123 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Compiled versions of decimal encoding/decoding hot paths
+
+Behaviour must match pure Python implementations in zubr/__init__.py
+"""
+from cpython.dict cimport PyDict_CheckExact, PyDict_Contains
+from cpython.list cimport PyList_CheckExact
+
+from decimal import Decimal
+
+cdef object _Decimal = Decimal
+
+
+cdef inline bint _is_encoded_decimal(object value):
+    return (
+        PyDict_Contains(value, 'mantissa') == 1
+        and PyDict_Contains(value, 'exponent') == 1
+    )
+
+
+cpdef object decode_decimal(dict encoded_decimal):
+    """
+    Decodes decimal from internal format
+    """
+    mantissa = encoded_decimal['mantissa']
+    exponent = encoded_decimal['exponent']
+
+    # Integer values need no scaling
+    if not exponent:
+        return _Decimal(mantissa)
+
+    return _Decimal(mantissa).scaleb(exponent)
+
+
+cpdef dict encode_decimal(object value):
+    """
+    Encodes decimal into internal format
+    """
+    cdef str integer, fraction, digits
+
+    if type(value) is int:
+        return {
+            'mantissa': value,
+            'exponent': 0
+        }
+
+    if type(value) is str:
+        integer, _, fraction = (<str>value).partition('.')
+        digits = integer[1:] if integer[:1] in ('-', '+') else integer
+
+        # Plain decimal notation is parsed without constructing Decimal
+        if (digits or fraction) and (
+            not digits or digits.isdecimal()
+        ) and (
+            not fraction or fraction.isdecimal()
+        ):
+            return {
+                'mantissa': int(integer + fraction),
+                'exponent': -len(fraction)
+            }
+
+    value = _Decimal(value)
+    exponent = value.as_tuple().exponent
+    mantissa = int(value.scaleb(-exponent))
+
+    return {
+        'mantissa': mantissa,
+        'exponent': exponent
+    }
+
+
+cpdef object decode_response(object response):
+    """
+    Decodes internal decimal representation into decimal.Decimal()
+
+    Containers are walked iteratively and modified in place
+    """
+    cdef list stack
+    cdef dict container_dict
+    cdef list container_list
+    cdef object container, key, value
+    cdef Py_ssize_t i
+
+    if PyDict_CheckExact(response):
+        if _is_encoded_decimal(response):
+            return decode_decimal(response)
+    elif not PyList_CheckExact(response):
+        return response
+
+    stack = [response]
+
+    while stack:
+        container = stack.pop()
+
+        if PyDict_CheckExact(container):
+            container_dict = <dict>container
+
+            for key, value in container_dict.items():
+                if PyDict_CheckExact(value):
+                    if _is_encoded_decimal(value):
+                        # Replacing the value of an existing key is safe
+                        # while iterating
+                        container_dict[key] = decode_decimal(value)
+                    else:
+                        stack.append(value)
+                elif PyList_CheckExact(value):
+                    stack.append(value)
+        else:
+            container_list = <list>container
+
+            for i in range(len(container_list)):
+                value = container_list[i]
+
+                if PyDict_CheckExact(value):
+                    if _is_encoded_decimal(value):
+                        container_list[i] = decode_decimal(value)
+                    else:
+                        stack.append(value)
+                elif PyList_CheckExact(value):
+                    stack.append(value)
+
+    return response
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Optional
+
+import websockets
+
+from . import ZubrSDK
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+__all__ = {
+    'AsyncZubrSDK',
+}
+
+logger = logging.getLogger(__name__)
+
+# Max size of incoming message, orderbook snapshots may be large
+_MAX_MESSAGE_SIZE = 2 ** 22
+
+
+class AsyncZubrSDK(ZubrSDK):
+    """
+    ZubrSDK running on asyncio event loop
+
+    Incoming messages are decoded and dispatched by a separate task,
+    so reading from the socket is not blocked by callbacks.
+    Methods must be called from the event loop thread.
+    """
+
+    def _init_transport(self, api_url: str):
+        self._ws_url: str = api_url
+        self._ws: Optional[websockets.WebSocketClientProtocol] = None
+        self._in_queue: Optional[asyncio.Queue] = None
+
+        # Outgoing frames are written by the writer task
+        self._send_queue = deque()
+        self._send_event: Optional[asyncio.Event] = None
+
+    async def run(self):
+        """
+        Connects to the server and handles messages until connection is closed
+
+        Raises errors of the reader and writer tasks
+        """
+        self._in_queue = asyncio.Queue()
+        self._send_event = asyncio.Event()
+
+        async with websockets.connect(
+            self._ws_url,
+            extra_headers=[
+                ('User-Agent', 'ZubrSDK'),
+            ],
+            compression=None,
+            max_size=_MAX_MESSAGE_SIZE,
+            ping_interval=15,
+        ) as ws:
+            self._ws = ws
+            tasks = [
+                asyncio.ensure_future(self._dispatch_messages()),
+                asyncio.ensure_future(self._write_frames()),
+            ]
+
+            for task in tasks:
+                task.add_done_callback(self._on_task_done)
+
+            self._on_open()
+
+            try:
+                async for message in ws:
+                    self._in_queue.put_nowait(message)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+
+                self._on_close()
+                self._ws = None
+
+                # Dispatch messages received before the connection was closed
+                while not self._in_queue.empty():
+                    self._handle_message(self._in_queue.get_nowait())
+
+            for result in results:
+                # Closed connection is reported by the reader
+                if isinstance(result, Exception) and not isinstance(
+                    result,
+                    (asyncio.CancelledError, websockets.ConnectionClosed)
+                ):
+                    raise result
+
+    def run_forever(self):
+        """
+        Runs the client on a new event loop, uvloop is used if installed
+        """
+        if uvloop is not None:
+            loop = uvloop.new_event_loop()
+        else:
+            loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(self.run())
+        finally:
+            loop.close()
+
+    def flush(self):
+        """
+        Does nothing, frames are written by the writer task as soon as
+        the event loop runs it
+        """
+
+    def _on_open(self):
+        self._ws_open = True
+        self._try_login()
+
+    def _on_close(self, *args):
+        self._ws_open = False
+
+        # Unsent requests are sent after the next login
+        self._delayed_requests[:0] = self._send_queue
+        self._send_queue.clear()
+
+    def _on_task_done(self, task: asyncio.Future):
+        if task.cancelled() or task.exception() is None:
+            return
+
+        # Stop reading, so run() finishes and raises the error
+        if self._ws is not None:
+            asyncio.ensure_future(self._ws.close())
+
+    def _send(self, frame: bytes):
+        if self._ws_open:
+            self._send_queue.append(frame)
+            self._send_event.set()
+        else:
+            self._delayed_requests.append(frame)
+
+    def _send_delayed_requests(self):
+        delayed_requests = self._delayed_requests
+        self._delayed_requests = []
+
+        self._send_queue.extend(delayed_requests)
+        self._send_event.set()
+
+    async def _write_frames(self):
+        send_queue = self._send_queue
+
+        while True:
+            await self._send_event.wait()
+            self._send_event.clear()
+
+            while send_queue:
+                # websockets sends str as text frames, the frame is removed
+                # from the queue only when it is written
+                await self._ws.send(send_queue[0].decode('utf-8'))
+                send_queue.popleft()
+
+    async def _dispatch_messages(self):
+        while True:
+            self._handle_message(await self._in_queue.get())
+
+    def _handle_message(self, message: str):
+        try:
+            self._process_message(message)
+        except Exception:
+            logger.exception('Failed to handle message')